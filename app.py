@@ -4,7 +4,11 @@ app.py  ― エントリーポイント
 """
 
 import streamlit as st
-from modules import data, search, transfer, dashboard, settings
+from modules import data, search, transfer, dashboard, analysis, settings
+
+# 大きなシート向け：各タブが宣言した列だけをチャンク単位で読み込む（gspread の範囲読み込み）
+# secrets.toml の [app] に stream_load = true で有効
+STREAM_LOAD = bool(data.app_config("stream_load", False))
 
 # ─────────────────────────────────────────────
 #  ページ設定
@@ -21,7 +25,13 @@ st.title("👓 マトイ・ニコメ 在庫管理システム")
 #  データ読み込み
 # ─────────────────────────────────────────────
 with st.spinner("データ読み込み中..."):
-    df = data.load()
+    if STREAM_LOAD:
+        df = data.load(
+            columns=data.required_columns(search, transfer, dashboard, analysis, settings),
+            stream=True,
+        )
+    else:
+        df = data.load()
 
 if df is None or df.empty:
     st.error("データを読み込めませんでした。Secrets とスプレッドシート設定を確認してください。")
@@ -40,6 +50,7 @@ tabs = st.tabs([
     "🔍 検索・更新",
     "🔄 店間移動",
     "📊 ダッシュボード",
+    "📈 在庫分析",
     "⚙️ 設定",
     # "📈 売上レポート",   ← 将来追加例
     # "📦 一括更新",       ← 将来追加例
@@ -55,6 +66,9 @@ with tabs[2]:
     dashboard.render(df)
 
 with tabs[3]:
+    analysis.render(df)
+
+with tabs[4]:
     settings.render(df)
 
 # ─────────────────────────────────────────────
@@ -66,3 +80,12 @@ col_f1.caption("マトイ・ニコメ 在庫管理システム v2.1 | Powered by
 if col_f2.button("🔄 データを再読み込み"):
     data.force_reload()
     st.rerun()
+
+# ─────────────────────────────────────────────
+#  ストリーミング読み込み：1チャンク目を描画した後、残りをまとめて取得して1回だけ再描画
+# ─────────────────────────────────────────────
+if data.is_streaming():
+    bar = st.progress(0.0, text=f"⏳ 残りのデータを読み込み中...（{len(df)} 件読み込み済み）")
+    data.load_remaining(lambda done, total: bar.progress(
+        done / total, text=f"⏳ 残りのデータを読み込み中...（{done} / {total} 行）"))
+    st.rerun()
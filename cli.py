@@ -0,0 +1,230 @@
+"""
+cli.py  ― 夜間バッチ・cron 用コマンドライン（Streamlit 不要）
+
+使い方:
+  python cli.py snapshot [-o snapshots/]                 シート → ローカルスナップショット
+  python cli.py query [--store ニコメ] [--model ...] [--count]
+  python cli.py update --ids 12,34 --flag 〇 [--year 2025 --month 4]
+  python cli.py update --csv updates.csv                 ID,売上フラグ[,売上年,売上月] の一括更新
+  python cli.py transfer --id 1234 --to マトイ
+  python cli.py report stock|sales|transfers [--year 2025]
+  python cli.py report aging|slow|sell-through [--by ブランド] [--days 180] [--months 6]
+  python cli.py export -o out.csv [検索条件]
+
+共通:
+  --source PATH   シートの代わりにローカルファイル（csv/xlsx/parquet）を読む。
+                  update / transfer はこのファイルへ書き戻す。
+  --secrets PATH  secrets.toml の場所（既定: .streamlit/secrets.toml）
+
+起動を速くするため pandas 等はサブコマンド内で import する。
+"""
+
+import argparse
+import sys
+
+
+# ─────────────────────────────────────────────
+#  入出力
+# ─────────────────────────────────────────────
+def _load(args):
+    from modules import storage
+    if args.source:
+        return storage.read_file(args.source)
+    return storage.read_sheet(storage.load_sheet_config(args.secrets))
+
+def _save(args, df):
+    from modules import storage
+    if args.source:
+        storage.write_file(df, args.source)
+    else:
+        storage.write_sheet(storage.load_sheet_config(args.secrets), df)
+
+def _print(df):
+    import pandas as pd
+    with pd.option_context("display.max_rows", None, "display.max_columns", None,
+                           "display.width", None):
+        print(df.to_string(index=False))
+
+def _query(args, df):
+    from modules import core
+    brands = [b.strip() for b in args.brand.split(",")] if args.brand else None
+    return core.query(df, show_all=args.all, store=args.store, brands=brands,
+                      id_text=args.id or "", model=args.model or "", color=args.color or "")
+
+# ─────────────────────────────────────────────
+#  サブコマンド
+# ─────────────────────────────────────────────
+def cmd_snapshot(args):
+    import os
+    from datetime import datetime
+    from modules import storage
+    df   = _load(args)
+    name = f"inventory_{datetime.now():%Y%m%d_%H%M%S}.{args.format}"
+    path = os.path.join(args.output, name)
+    storage.write_file(df, path)
+    print(f"{len(df)} 件を {path} に保存しました")
+
+def cmd_query(args):
+    result = _query(args, _load(args))
+    if args.count:
+        print(len(result))
+    else:
+        _print(result)
+
+def cmd_export(args):
+    from modules import storage
+    result = _query(args, _load(args))
+    storage.write_file(result, args.output)
+    print(f"{len(result)} 件を {args.output} に書き出しました")
+
+def cmd_update(args):
+    import pandas as pd
+    from modules import core
+    df = _load(args)
+
+    if args.csv:
+        updates = pd.read_csv(args.csv, dtype=object).fillna("")
+    elif args.ids and args.flag is not None:
+        updates = pd.DataFrame({"ID": args.ids.split(","), "売上フラグ": args.flag})
+    else:
+        sys.exit("--csv か --ids と --flag を指定してください")
+
+    # 正規化した ID → 行 index の対応表を1回だけ作る（CSV の行ごとに全件走査しない）
+    rows_by_id = df.index.groupby(df["ID"].map(core.normalize_id))
+
+    changed, missing = 0, []
+    for _, u in updates.iterrows():
+        flag = str(u.get("売上フラグ", "")).strip()
+        if flag not in core.FLAG_LABELS:
+            sys.exit(f"不正なフラグ: {flag!r}（使えるのは {list(core.FLAG_LABELS)}）")
+        year  = u.get("売上年")  or args.year
+        month = u.get("売上月") or args.month
+        idxs  = rows_by_id.get(core.normalize_id(u["ID"]), [])
+        if len(idxs) == 0:
+            missing.append(str(u["ID"]))
+        for idx in idxs:
+            core.update_flag(df, idx, flag,
+                             year=int(year) if year else None,
+                             month=int(month) if month else None)
+            changed += 1
+
+    if missing:
+        print(f"見つからない ID: {', '.join(missing)}", file=sys.stderr)
+    if args.dry_run:
+        print(f"{changed} 件を更新予定（--dry-run のため保存しません）")
+        return
+    if changed:
+        _save(args, df)
+    print(f"{changed} 件を更新しました")
+
+def cmd_transfer(args):
+    from modules import core
+    df   = _load(args)
+    if args.to not in core.stores(df):
+        print(f"注意: {args.to} はまだデータにない店舗です（{', '.join(core.stores(df))}）",
+              file=sys.stderr)
+    idxs = core.find_ids(df, [args.id])
+    if idxs.empty:
+        sys.exit(f"ID {args.id} が見つかりません")
+    for idx in idxs:
+        from_store = str(df.at[idx, "店舗"])
+        if from_store == args.to:
+            sys.exit(f"ID {args.id} はすでに {args.to} にあります")
+        core.transfer_item(df, idx, from_store, args.to)
+        print(f"ID {args.id}: {from_store} → {args.to}")
+    if not args.dry_run:
+        _save(args, df)
+
+def cmd_report(args):
+    from datetime import date
+    from modules import aging, core, storage
+    df = _load(args)
+    if args.kind in ("aging", "slow", "sell-through"):
+        dates = aging.parse_dates(df)
+    if args.kind == "aging":
+        result = aging.aging_by(df, dates, args.by, slow_days=args.days)
+    elif args.kind == "slow":
+        result = aging.slow_movers(df, dates, slow_days=args.days)
+    elif args.kind == "sell-through":
+        result = aging.sell_through(df, dates, args.by, months=args.months)
+    elif args.kind == "stock":
+        result = core.stock_by(df, args.by)
+    elif args.kind == "sales":
+        year   = args.year or date.today().year
+        result = core.sales_by_month(df, year) if args.by == "月" else core.sales_by(df, args.by)
+    else:
+        result = core.transfer_history(df)
+    if args.output:
+        storage.write_file(result, args.output)
+        print(f"{len(result)} 行を {args.output} に書き出しました")
+    else:
+        _print(result)
+
+# ─────────────────────────────────────────────
+#  引数定義
+# ─────────────────────────────────────────────
+def _add_filters(p):
+    p.add_argument("--store", help="店舗で絞り込み")
+    p.add_argument("--brand", help="ブランド（カンマ区切り）")
+    p.add_argument("--id",    help="ID（部分一致）")
+    p.add_argument("--model", help="モデル名（部分一致）")
+    p.add_argument("--color", help="カラー（部分一致）")
+    p.add_argument("--all", action="store_true", help="売済等も含める")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="マトイ・ニコメ 在庫管理 CLI")
+    parser.add_argument("--source", help="ローカルファイルを読む（csv/xlsx/parquet）")
+    parser.add_argument("--secrets", default=None, help="secrets.toml のパス")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("snapshot", help="在庫のスナップショットを保存")
+    p.add_argument("-o", "--output", default="snapshots", help="保存先ディレクトリ")
+    p.add_argument("--format", choices=["parquet", "csv", "xlsx"], default="parquet")
+    p.set_defaults(func=cmd_snapshot)
+
+    p = sub.add_parser("query", help="検索タブと同じ条件で検索")
+    _add_filters(p)
+    p.add_argument("--count", action="store_true", help="件数だけ表示")
+    p.set_defaults(func=cmd_query)
+
+    p = sub.add_parser("export", help="検索結果をファイルに書き出し")
+    _add_filters(p)
+    p.add_argument("-o", "--output", required=True, help="出力先（拡張子で形式を判定）")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("update", help="売上フラグの一括更新")
+    p.add_argument("--ids",   help="ID（カンマ区切り）")
+    p.add_argument("--flag",  help="売上フラグ（空文字で在庫ありに戻す）")
+    p.add_argument("--year",  type=int, help="売上年（〇のとき）")
+    p.add_argument("--month", type=int, help="売上月（〇のとき）")
+    p.add_argument("--csv",   help="ID,売上フラグ[,売上年,売上月] の CSV")
+    p.add_argument("--dry-run", action="store_true", help="保存しない")
+    p.set_defaults(func=cmd_update)
+
+    p = sub.add_parser("transfer", help="店間移動")
+    p.add_argument("--id", required=True)
+    p.add_argument("--to", required=True, help="移動先店舗")
+    p.add_argument("--dry-run", action="store_true", help="保存しない")
+    p.set_defaults(func=cmd_transfer)
+
+    p = sub.add_parser("report", help="在庫数・売上・移動のレポート")
+    p.add_argument("kind", choices=["stock", "sales", "transfers", "aging", "slow", "sell-through"])
+    p.add_argument("--by", default="店舗", help="集計キー（店舗/ブランド、sales は 月 も可）")
+    p.add_argument("--year", type=int, help="sales --by 月 の対象年")
+    p.add_argument("--days", type=int, default=180, help="aging/slow の滞留日数")
+    p.add_argument("--months", type=int, help="sell-through の集計期間（直近か月）")
+    p.add_argument("-o", "--output", help="ファイルに書き出す")
+    p.set_defaults(func=cmd_report)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.secrets is None:
+        from modules.storage import SECRETS_PATH
+        args.secrets = SECRETS_PATH
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+loadtest.py  ― 同時セッション負荷テスト（Streamlit AppTest + 擬似スプレッドシート）
+
+app.py を streamlit.testing.v1.AppTest でヘッドレスに動かし、
+N 個のセッションが 検索 → メモ → フラグ → 店間移動 を同時に行ったときの
+再実行レイテンシ・セッションあたりメモリ・API 呼び出し回数と転送量を測る。
+
+使い方:
+  python loadtest.py                                  1,5,10,20 セッション
+  python loadtest.py --sessions 1,10,50 --rows 20000 --rounds 3
+  python loadtest.py --api-latency 0.3 --csv result.csv
+  python loadtest.py --sequential                     セッションを1つずつ順番に実行
+  python loadtest.py --stream                         [app] stream_load = true（範囲読み込み）で実行
+
+Google Sheets には接続しない（modules.data.get_conn / get_worksheet を FakeSheet に差し替える）。
+FakeSheet は gspread の Worksheet と同じ呼び出しに答えるセル表で、
+読み書きは本物の gspread_dataframe（get_as_dataframe / set_with_dataframe）を通す。
+途中に空行を混ぜるので、行位置のずれは最後の整合性チェック（corrupt_rows）で検出される。
+
+計測の方針:
+  - レイテンシは tracemalloc を止めた状態で測る
+  - メモリは操作後に「もう1セッション増やしたときの増分」と
+    各セッションの session_state の大きさで測る（共有キャッシュを人数で割らない）
+設定ファイル（modules.prefs）は一時ディレクトリに書く。
+"""
+
+import argparse
+import gc
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+# modules.prefs は import 時に保存先を決めるので先に一時ディレクトリへ向ける
+os.environ.setdefault("STORE_STOCKS_PREFS_DIR", tempfile.mkdtemp(prefix="loadtest_prefs_"))
+
+import pandas as pd
+import streamlit as st
+from gspread.utils import a1_to_rowcol
+from gspread_dataframe import get_as_dataframe, set_with_dataframe
+from streamlit.testing.v1 import AppTest
+
+from modules import data as D
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+COLUMNS = ["ID", "ブランド", "モデル", "カラー", "上代（税込）", "下代", "店舗",
+           "売上フラグ", "売上年", "売上月", "入荷年月日", "移動元", "移動先", "移動日", "備考"]
+BRANDS  = ["Ray-Ban", "OLIVER PEOPLES", "金子眼鏡", "999.9", "EYEVAN", "MOSCOT",
+           "TOM FORD", "masunaga", "BJ CLASSIC", "白山眼鏡店"]
+COLORS  = ["BK", "DEMI", "GOLD", "SILVER", "CLEAR", "BR"]
+
+
+# ─────────────────────────────────────────────
+#  擬似スプレッドシート
+#  GSheetsConnection の read / update と、storage が使う gspread の範囲読み込みを再現
+# ─────────────────────────────────────────────
+class FakeSheet:
+    title = "在庫"
+
+    def __init__(self, rows: int, stores: list, latency: float = 0.0, seed: int = 0,
+                 blank_every: int = 0):
+        self.latency = latency
+        self.stores  = stores
+        self._lock   = threading.Lock()
+        self._rows   = rows
+        self._seed   = seed
+        self._blank_every = blank_every
+        self.reset()
+
+    def reset(self):
+        """初期データに戻してカウンタを0にする"""
+        df = make_inventory(self._rows, self.stores, self._seed)
+        self.grid = [list(df.columns)]
+        for i, rec in enumerate(df.itertuples(index=False), start=1):
+            self.grid.append(list(rec))
+            if self._blank_every and i % self._blank_every == 0:
+                self.grid.append([""] * len(df.columns))   # シート途中の空行
+        self.original = [row[:] for row in self.grid]
+        self.reads = self.writes = 0
+        self.cells_read = self.bytes_read = self.cells_written = 0
+
+    # ── gspread Worksheet 互換（gspread_dataframe / modules.storage から呼ばれる） ──
+    @property
+    def spreadsheet(self):
+        return self
+
+    @property
+    def row_count(self) -> int:
+        return len(self.grid)
+
+    @property
+    def col_count(self) -> int:
+        return max((len(r) for r in self.grid), default=0)
+
+    def values_get(self, range_name, params=None):
+        """シート全体（get_as_dataframe が使う）"""
+        return {"values": self._get(1, 1, self.row_count, self.col_count)}
+
+    def row_values(self, row: int) -> list:
+        return self._get(row, 1, row, self.col_count)[0] if row <= self.row_count else []
+
+    def col_values(self, col: int) -> list:
+        return [r[0] if r else "" for r in self._get(1, col, self.row_count, col)]
+
+    def batch_get(self, ranges: list) -> list:
+        out = []
+        for a1 in ranges:
+            first, last = a1.split(":")
+            (r0, c0), (r1, c1) = a1_to_rowcol(first), a1_to_rowcol(last)
+            out.append(self._get(r0, c0, r1, c1, count=False))
+        self._count(out)
+        return out
+
+    def clear(self):
+        self._call()
+        with self._lock:
+            self.grid = [[""] * len(r) for r in self.grid]
+
+    def resize(self, rows: int = None, cols: int = None):
+        with self._lock:
+            if rows is not None:
+                self.grid = self.grid[:rows] + [[""] * self.col_count
+                                                for _ in range(rows - len(self.grid))]
+            if cols is not None:
+                self.grid = [(r + [""] * cols)[:cols] for r in self.grid]
+
+    def update_cells(self, cells: list, value_input_option: str = None):
+        self._call()
+        with self._lock:
+            self.writes += 1
+            self.cells_written += len(cells)
+            for c in cells:
+                self.grid[c.row - 1][c.col - 1] = _user_entered(c.value)
+
+    # ── GSheetsConnection 互換（modules.data.get_conn から呼ばれる） ──
+    def read(self, ttl=None, **options) -> pd.DataFrame:
+        return get_as_dataframe(self, evaluate_formulas=True, **options)
+
+    def update(self, data: pd.DataFrame = None, **_):
+        self.clear()
+        set_with_dataframe(self, data)
+
+    # ── 内部 ──
+    def _get(self, r0: int, c0: int, r1: int, c1: int, count: bool = True) -> list:
+        """Sheets API と同じく末尾の空セル・空行を詰めて返す"""
+        self._call()
+        with self._lock:
+            rows = [_rstrip(r[c0 - 1:c1]) for r in self.grid[r0 - 1:r1]]
+        while rows and not rows[-1]:
+            rows.pop()
+        if count:
+            self._count([rows])
+        return rows
+
+    def _call(self):
+        time.sleep(self.latency)
+
+    def _count(self, blocks: list):
+        cells = sum(len(r) for rows in blocks for r in rows)
+        size  = sum(len(str(v).encode()) for rows in blocks for r in rows for v in r)
+        with self._lock:
+            self.reads      += 1
+            self.cells_read += cells
+            self.bytes_read += size
+
+    def counters(self) -> dict:
+        """API 呼び出し回数・転送量の現在値"""
+        with self._lock:
+            return {"reads": self.reads, "writes": self.writes, "cells_read": self.cells_read,
+                    "bytes_read": self.bytes_read, "cells_written": self.cells_written}
+
+    def corrupt_rows(self) -> int:
+        """
+        移動・フラグ操作で変わらない列（ブランド・モデル等）が
+        元の ID と食い違っている行数。ヘッダーの列順が変わった場合も全行を数える。
+        """
+        header = self.original[0]
+        with self._lock:
+            grid = [row[:] for row in self.grid]
+        if grid[0][:len(header)] != header:
+            return self._rows
+        keep = [header.index(c) for c in FIXED_COLUMNS]
+        key  = lambda r: tuple(str(r[i]) for i in keep)
+        want = {str(r[0]): key(r) for r in self.original[1:] if r[0] != ""}
+        have = {str(r[0]): key(r) for r in grid[1:] if len(r) == len(header) and r[0] != ""}
+        return sum(have.get(i) != k for i, k in want.items())
+
+
+FIXED_COLUMNS = ["ID", "ブランド", "モデル", "カラー", "上代（税込）", "下代", "入荷年月日"]
+
+
+def _rstrip(row: list) -> list:
+    end = len(row)
+    while end and row[end - 1] in ("", None):
+        end -= 1
+    return row[:end]
+
+
+def _user_entered(value):
+    """USER_ENTERED と同じく数値に見える文字列は数値として保存する（整数値は int で返る）"""
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def make_inventory(rows: int, stores: list, seed: int = 0) -> pd.DataFrame:
+    """シートと同じ15列の在庫データを生成（約7割が在庫あり）"""
+    rnd = random.Random(seed)
+    records = []
+    for i in range(rows):
+        flag = rnd.choices(["", "〇", "△", "▲", "×"], weights=[70, 22, 3, 3, 2])[0]
+        sold = flag == "〇"
+        moved = rnd.random() < 0.1
+        src, dst = rnd.sample(stores, 2) if moved and len(stores) > 1 else ("", "")
+        price = rnd.randrange(20000, 80000, 1000)
+        records.append([
+            1000 + i,
+            rnd.choice(BRANDS),
+            f"M{1000 + i:05d}",
+            rnd.choice(COLORS),
+            price,
+            price // 2,
+            dst or rnd.choice(stores),
+            flag,
+            rnd.choice([2023, 2024, 2025]) if sold else "",
+            rnd.randint(1, 12) if sold else "",
+            f"20{rnd.randint(22, 25)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            src,
+            dst,
+            f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}" if moved else "",
+            "",
+        ])
+    return pd.DataFrame(records, columns=COLUMNS)
+
+
+# ─────────────────────────────────────────────
+#  セッションの操作シナリオ
+# ─────────────────────────────────────────────
+def flow_steps(at: AppTest, row: pd.Series):
+    """1商品分の操作（名前, 実行関数）を順に返す"""
+    idx, item_id, model = row.name, str(row["ID"]), row["モデル"]
+    return [
+        ("search",   lambda: at.text_input(key="s_model").input(model).run()),
+        ("memo",     lambda: at.text_input(key=f"memo_{idx}").input("負荷テスト").run()),
+        ("flag",     lambda: at.selectbox(key=f"flag_sel_{idx}").set_value("△").run()),
+        ("find_id",  lambda: at.text_input(key="transfer_id").input(item_id).run()),
+        ("confirm",  lambda: at.checkbox(key=f"confirm_{idx}").check().run()),
+        ("transfer", lambda: at.button(key=f"transfer_{idx}").click().run()),
+        ("clear",    lambda: at.text_input(key="s_model").input("").run()),
+    ]
+
+
+def run_session(at: AppTest, rows: list, timings: list, errors: list):
+    for row in rows:
+        for name, step in flow_steps(at, row):
+            t0 = time.perf_counter()
+            try:
+                step()
+            except Exception as e:   # ウィジェットが見つからない等
+                errors.append(f"{name}: {type(e).__name__}: {e}")
+                continue
+            timings.append((name, time.perf_counter() - t0))
+            if at.exception:
+                errors.append(f"{name}: {at.exception[0].message}")
+
+
+# ─────────────────────────────────────────────
+#  1段階（N セッション）の計測
+# ─────────────────────────────────────────────
+def new_session(stream: bool, user: str, timeout: float) -> AppTest:
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.query_params["user"] = user
+    at.secrets["app"] = {"stream_load": stream}   # secrets の [app] stream_load と同じ
+    return at
+
+
+def run_level(sheet: FakeSheet, stream: bool, sessions: int, rounds: int, sequential: bool,
+              timeout: float) -> dict:
+    st.cache_data.clear()
+    sheet.reset()
+
+    # 初回表示（tracemalloc は止めたまま時間だけ測る）
+    apps, initial = [], []
+    for s in range(sessions):
+        at = new_session(stream, f"loadtest{s}", timeout)
+        t0 = time.perf_counter()
+        at.run()
+        initial.append(time.perf_counter() - t0)
+        apps.append(at)
+    initial_cells = sheet.cells_read
+
+    # 対象商品：セッション × ラウンドごとに別の在庫品を割り当てる（+1 は増分計測用）
+    # 行 index は読み込み方式で変わるので、アプリが持っている df から選ぶ
+    df    = apps[0].session_state[D._CACHE_KEY]
+    stock = df[df["売上フラグ"] == ""]
+    picks = [[stock.iloc[(r * (sessions + 1) + s) % len(stock)] for r in range(rounds)]
+             for s in range(sessions + 1)]
+
+    timings, errors = [], []
+    t0 = time.perf_counter()
+    if sequential:
+        for at, rows in zip(apps, picks):
+            run_session(at, rows, timings, errors)
+    else:
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            for f in [pool.submit(run_session, at, rows, timings, errors)
+                      for at, rows in zip(apps, picks)]:
+                f.result()
+    wall = time.perf_counter() - t0
+
+    # API の回数・転送量と整合性は N セッション分だけで数える（増分計測のセッションを含めない）
+    api     = sheet.counters()
+    corrupt = sheet.corrupt_rows()
+
+    state_bytes = statistics.mean(_state_bytes(at.session_state.to_dict()) for at in apps)
+    marginal    = _marginal_session_bytes(stream, picks[-1], timeout)
+
+    latencies = sorted(t for _, t in timings)
+    return {
+        "sessions":      sessions,
+        "reruns":        len(latencies),
+        "initial_p50_ms": _ms(statistics.median(initial)),
+        "p50_ms":        _ms(_percentile(latencies, 50)),
+        "p95_ms":        _ms(_percentile(latencies, 95)),
+        "max_ms":        _ms(latencies[-1]) if latencies else None,
+        "reruns_per_s":  round(len(latencies) / wall, 1) if wall else None,
+        "state_mb_per_session":  round(state_bytes / 2**20, 2),
+        "mem_mb_next_session":   round(marginal / 2**20, 2),
+        "api_reads":     api["reads"],
+        "initial_cells_read": initial_cells,
+        "cells_read":    api["cells_read"],
+        "mb_read":       round(api["bytes_read"] / 2**20, 2),
+        "api_writes":    api["writes"],
+        "cells_written": api["cells_written"],
+        "corrupt_rows":  corrupt,
+        "errors":        len(errors),
+        "_errors":       errors,
+    }
+
+
+def _marginal_session_bytes(stream: bool, rows: list, timeout: float) -> int:
+    """
+    操作後（キャッシュが温まった状態）にもう1セッション足したときのメモリ増分。
+    共有キャッシュは既にあるので、ここで増えるのはそのセッション固有の分だけ。
+    """
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    at = new_session(stream, "loadtest_next", timeout)
+    at.run()
+    run_session(at, rows, [], [])
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del at
+    return used
+
+
+def _state_bytes(obj, seen: set = None) -> int:
+    """session_state の中身のおおよそのバイト数（DataFrame は deep で数える）"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, io.BytesIO):
+        return obj.getbuffer().nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_state_bytes(k, seen) + _state_bytes(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_state_bytes(v, seen) for v in obj)
+    return size
+
+
+def _percentile(values: list, pct: float):
+    if not values:
+        return None
+    k = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[k]
+
+
+def _ms(sec):
+    return None if sec is None else round(sec * 1000, 1)
+
+
+# ─────────────────────────────────────────────
+#  エントリーポイント
+# ─────────────────────────────────────────────
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="loadtest.py", description="同時セッション負荷テスト")
+    p.add_argument("--sessions", default="1,5,10,20", help="セッション数（カンマ区切りで段階実行）")
+    p.add_argument("--rounds", type=int, default=2, help="1セッションあたりの操作シナリオ回数")
+    p.add_argument("--rows", type=int, default=5000, help="擬似シートの行数")
+    p.add_argument("--stores", default="ニコメ,マトイ", help="擬似シートの店舗（カンマ区切り）")
+    p.add_argument("--api-latency", type=float, default=0.0, help="API 1回あたりの擬似遅延（秒）")
+    p.add_argument("--timeout", type=float, default=60.0, help="1回の再実行のタイムアウト（秒）")
+    p.add_argument("--sequential", action="store_true", help="セッションを同時ではなく順番に実行")
+    p.add_argument("--stream", action="store_true", help="secrets の [app] stream_load を有効にして実行")
+    p.add_argument("--blank-every", type=int, default=97, help="この行数ごとに空行を挟む（0 で無し）")
+    p.add_argument("--csv", help="結果を CSV にも書き出す")
+    args = p.parse_args(argv)
+
+    sheet = FakeSheet(args.rows, args.stores.split(","), latency=args.api_latency,
+                      blank_every=args.blank_every)
+    # app.py からの API 呼び出しをすべて擬似シートへ
+    D.get_conn      = lambda: sheet
+    D.get_worksheet = lambda: sheet
+
+    results = []
+    for n in (int(x) for x in args.sessions.split(",")):
+        print(f"▶ {n} セッション計測中...", file=sys.stderr)
+        res = run_level(sheet, args.stream, n, args.rounds, args.sequential, args.timeout)
+        for e in res["_errors"][:3]:
+            print(f"  ! {e}", file=sys.stderr)
+        results.append(res)
+
+    table = pd.DataFrame(results).drop(columns=["_errors"])
+    print(table.to_string(index=False))
+    if args.csv:
+        table.to_csv(args.csv, index=False, encoding="utf-8-sig")
+
+
+if __name__ == "__main__":
+    main()
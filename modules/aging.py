@@ -0,0 +1,113 @@
+"""
+aging.py
+在庫日数・回転の分析（Streamlit 非依存）
+
+日付列は parse_dates() で1回だけ datetime に変換し、以降の集計はすべてベクトル演算。
+在庫 df 自体には列を足さない（シートへの書き戻しに混ざらないよう別フレームで持つ）。
+
+  入荷日 : 入荷年月日
+  売上日 : 売上年 / 売上月 の1日（売上フラグ 〇 の行のみ）
+  移動日 : 移動日
+"""
+
+from datetime import date
+
+import pandas as pd
+
+from modules import core
+
+# 分析に必要な列（ストリーミング読み込み時は ensure_columns で取得）
+COLUMNS = ["店舗", "ブランド", "売上フラグ", "売上年", "売上月",
+           "入荷年月日", "移動元", "移動先", "移動日"]
+
+SLOW_DAYS = 180   # これ以上在庫にある商品を滞留品とみなす（日）
+
+
+# ─────────────────────────────────────────────
+#  日付の前処理
+# ─────────────────────────────────────────────
+def parse_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """df と同じ index で 入荷日 / 売上日 / 移動日 を datetime64 で返す"""
+    out = pd.DataFrame(index=df.index)
+    out["入荷日"] = core.parse_date(df["入荷年月日"]) if "入荷年月日" in df.columns else pd.NaT
+    if "売上年" in df.columns and "売上月" in df.columns:
+        sold = df["売上フラグ"] == "〇"
+        ym = pd.DataFrame({
+            "year":  pd.to_numeric(df["売上年"], errors="coerce").where(sold),
+            "month": pd.to_numeric(df["売上月"], errors="coerce").where(sold),
+            "day":   1,
+        })
+        out["売上日"] = pd.to_datetime(ym, errors="coerce")
+    else:
+        out["売上日"] = pd.NaT
+    out["移動日"] = core.parse_date(df["移動日"]) if "移動日" in df.columns else pd.NaT
+    return out
+
+def days_in_stock(df: pd.DataFrame, dates: pd.DataFrame, today: date = None) -> pd.Series:
+    """
+    在庫日数。在庫ありは 今日 − 入荷日、売上済みは 売上日 − 入荷日。
+    入荷日が無い行は NaN。
+    """
+    today = pd.Timestamp(today or date.today())
+    end = dates["売上日"].mask(core.in_stock_mask(df), today)
+    return (end - dates["入荷日"]).dt.days.clip(lower=0)
+
+# ─────────────────────────────────────────────
+#  集計
+# ─────────────────────────────────────────────
+def aging_by(df: pd.DataFrame, dates: pd.DataFrame, keys, today: date = None,
+             slow_days: int = SLOW_DAYS) -> pd.DataFrame:
+    """keys（店舗・ブランド等）別の在庫数・平均/最大在庫日数・滞留品数"""
+    keys  = [keys] if isinstance(keys, str) else list(keys)
+    stock = core.in_stock_mask(df)
+    days  = days_in_stock(df, dates, today)[stock]
+    frame = df.loc[stock, keys].assign(在庫日数=days, 滞留=days >= slow_days)
+    return (frame.groupby(keys)
+            .agg(在庫数=("在庫日数", "size"),
+                 平均在庫日数=("在庫日数", "mean"),
+                 最大在庫日数=("在庫日数", "max"),
+                 滞留品数=("滞留", "sum"))
+            .round({"平均在庫日数": 1})
+            .sort_values("平均在庫日数", ascending=False)
+            .reset_index())
+
+def slow_movers(df: pd.DataFrame, dates: pd.DataFrame, today: date = None,
+                slow_days: int = SLOW_DAYS) -> pd.DataFrame:
+    """在庫日数が slow_days 以上の在庫（古い順）"""
+    days = days_in_stock(df, dates, today)
+    mask = core.in_stock_mask(df) & (days >= slow_days)
+    cols = [c for c in ["ID","ブランド","モデル","カラー","店舗","入荷年月日"] if c in df.columns]
+    return (df.loc[mask, cols].assign(在庫日数=days[mask].astype(int))
+            .sort_values("在庫日数", ascending=False).reset_index(drop=True))
+
+def sell_through(df: pd.DataFrame, dates: pd.DataFrame, keys,
+                 months: int = None, today: date = None) -> pd.DataFrame:
+    """
+    消化率 = 売上数 / (売上数 + 現在庫数)。
+    months を指定すると直近 months か月の売上だけを数える。
+    """
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    sold = dates["売上日"].notna()
+    if months:
+        since = pd.Timestamp(today or date.today()).replace(day=1) - pd.DateOffset(months=months - 1)
+        sold &= dates["売上日"] >= since
+    frame = df[keys].assign(売上数=sold, 在庫数=core.in_stock_mask(df))
+    out = frame.groupby(keys)[["売上数", "在庫数"]].sum()
+    total = out["売上数"] + out["在庫数"]
+    out["消化率"] = (out["売上数"] / total.where(total > 0)).round(3)
+    return out.sort_values("消化率", ascending=False).reset_index()
+
+def transfer_frequency(df: pd.DataFrame, dates: pd.DataFrame, months: int = None,
+                       today: date = None) -> pd.DataFrame:
+    """移動元 → 移動先 ごとの移動件数と最終移動日（移動日は各商品の最新1件）"""
+    if "移動元" not in df.columns or "移動先" not in df.columns:
+        return pd.DataFrame(columns=["移動元", "移動先", "移動件数", "最終移動日"])
+    moved = dates["移動日"].notna()
+    if months:
+        since = pd.Timestamp(today or date.today()) - pd.DateOffset(months=months)
+        moved &= dates["移動日"] >= since
+    frame = df.loc[moved, ["移動元", "移動先"]].assign(移動日=dates.loc[moved, "移動日"])
+    return (frame.groupby(["移動元", "移動先"])
+            .agg(移動件数=("移動日", "size"), 最終移動日=("移動日", "max"))
+            .sort_values("移動件数", ascending=False)
+            .reset_index())
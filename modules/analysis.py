@@ -0,0 +1,92 @@
+"""
+analysis.py
+在庫分析タブ（在庫日数・滞留品・消化率・店間移動の頻度）
+
+日付の parse と各集計は data.derived() でデータバージョンごとに1回だけ計算する。
+在庫日数・集計期間は今日の日付で変わるので、集計の名前（キャッシュキー）に今日の日付を含める。
+"""
+
+from datetime import date
+
+import streamlit as st
+import pandas as pd
+from modules import aging, data as D, downloads
+
+# ストリーミング読み込み時にこのタブが必要とする列（入荷・移動の列は表示時に取得）
+COLUMNS = ["店舗", "ブランド", "売上フラグ", "売上年", "売上月"]
+
+
+def render(df: pd.DataFrame):
+    st.subheader("📈 在庫分析（在庫日数・回転）")
+
+    if not set(aging.COLUMNS) <= set(df.columns):
+        # 入荷年月日・移動列が未取得なら表示を求められた時だけ読み込む
+        if not st.toggle("入荷日・移動データを読み込んで分析する", value=False, key="a_load"):
+            return
+        df = D.ensure_columns(aging.COLUMNS)
+    if "入荷年月日" not in df.columns:
+        st.warning("「入荷年月日」列がスプレッドシートに存在しません。")
+        return
+    if D.is_streaming():
+        st.caption("⏳ データ読み込み中のため、読み込み済みの行だけで集計しています。")
+
+    dates = D.dates()
+    today = date.today()   # 日付をまたいで開いたままのセッションでも今日基準で集計し直す
+
+    o1, o2, _ = st.columns([1, 1, 2])
+    slow_days = o1.number_input("滞留とみなす日数", min_value=30, max_value=1095,
+                                value=aging.SLOW_DAYS, step=30, key="a_slow_days")
+    months    = o2.selectbox("消化率の集計期間", [3, 6, 12, 0], index=1, key="a_months",
+                             format_func=lambda m: "全期間" if m == 0 else f"直近 {m} か月")
+
+    # ── 在庫日数 ──────────────────────────────
+    st.markdown("#### 店舗別 在庫日数")
+    by_store = D.derived(f"aging_店舗_{slow_days}_{today}",
+                         lambda d: aging.aging_by(d, dates, "店舗", today=today,
+                                                  slow_days=slow_days))
+    st.dataframe(by_store, use_container_width=True, hide_index=True)
+    downloads.render(by_store, key="aging_store", stem="店舗別在庫日数",
+                     extra=(slow_days, today))
+
+    st.markdown("#### ブランド別 在庫日数（平均の長い順）")
+    by_brand = D.derived(f"aging_ブランド_{slow_days}_{today}",
+                         lambda d: aging.aging_by(d, dates, ["店舗", "ブランド"], today=today,
+                                                  slow_days=slow_days))
+    st.dataframe(by_brand, use_container_width=True, hide_index=True)
+    downloads.render(by_brand, key="aging_brand", stem="ブランド別在庫日数",
+                     extra=(slow_days, today))
+
+    # ── 滞留品 ────────────────────────────────
+    st.divider()
+    slow = D.derived(f"slow_{slow_days}_{today}",
+                     lambda d: aging.slow_movers(d, dates, today=today, slow_days=slow_days))
+    st.markdown(f"#### 滞留品（在庫 {slow_days} 日以上）　{len(slow)} 件")
+    if slow.empty:
+        st.info("滞留品はありません。")
+    else:
+        st.dataframe(slow, use_container_width=True, hide_index=True)
+        downloads.render(slow, key="slow_movers", stem="滞留品",
+                         extra=(slow_days, today))
+
+    # ── 消化率 ────────────────────────────────
+    st.divider()
+    st.markdown("#### ブランド別 消化率（売上数 ÷ (売上数 + 現在庫数)）")
+    st_brand = D.derived(f"sell_through_{months}_{today}",
+                         lambda d: aging.sell_through(d, dates, ["店舗", "ブランド"],
+                                                      months=months or None, today=today))
+    st.dataframe(st_brand, use_container_width=True, hide_index=True)
+    downloads.render(st_brand, key="sell_through", stem="ブランド別消化率",
+                     extra=(months, today))
+
+    # ── 店間移動 ──────────────────────────────
+    st.divider()
+    st.markdown("#### 店間移動の頻度")
+    freq = D.derived(f"transfer_freq_{months}_{today}",
+                     lambda d: aging.transfer_frequency(d, dates, months=months or None,
+                                                        today=today))
+    if freq.empty:
+        st.info("該当期間の移動はありません。")
+    else:
+        st.dataframe(freq, use_container_width=True, hide_index=True)
+        downloads.render(freq, key="transfer_freq", stem="店間移動の頻度",
+                         extra=(months, today))
@@ -0,0 +1,189 @@
+"""
+core.py
+在庫データのモデルと更新ロジック（Streamlit 非依存）
+
+Web アプリ（modules/data.py 経由）と CLI（cli.py）の両方から使う。
+ここでは streamlit を import しないこと。
+"""
+
+from datetime import date
+
+import pandas as pd
+
+# ─────────────────────────────────────────────
+#  定数
+# ─────────────────────────────────────────────
+FLAG_LABELS = {
+    "〇": "売上済み",
+    "△": "スタッフ用",
+    "▲": "返品",
+    "×": "除外",
+    "":  "在庫あり",
+}
+STORES = ["ニコメ", "マトイ"]   # 既定の店舗順（データに他の店舗があれば stores() で後ろに追加）
+ALL_STORES = "全店"             # 店舗フィルタの「全店舗」選択肢
+NUM_COLS = 15   # シートから読む列数（先頭から）
+# アプリが文字列・空文字を書き込む列。空欄ばかりだと float64 で読まれ、代入できなくなる
+EDITABLE_COLS = ["店舗", "売上年", "売上月", "移動元", "移動先", "移動日", "備考"]
+
+# ─────────────────────────────────────────────
+#  正規化
+# ─────────────────────────────────────────────
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    列名の空白除去と売上フラグの文字列化（読み込み直後に1回呼ぶ）。
+    更新で書き込む列は object 型にしておく（空欄のままの NaN は残す）。
+    """
+    df.columns = df.columns.astype(str).str.strip()
+    if "売上フラグ" in df.columns:
+        df["売上フラグ"] = df["売上フラグ"].fillna("").astype(str).str.strip()
+    for col in EDITABLE_COLS:
+        if col in df.columns and df[col].dtype != object:
+            df[col] = df[col].astype(object)
+    return df
+
+def normalize_id(val) -> str:
+    """ID を表示・照合用の文字列に（1234.0 → "1234"）"""
+    try:
+        return str(int(float(val)))
+    except Exception:
+        return str(val).strip()
+
+def find_ids(df: pd.DataFrame, ids) -> pd.Index:
+    """ID の完全一致で行 index を返す"""
+    wanted = {normalize_id(i) for i in ids}
+    return df.index[df["ID"].map(normalize_id).isin(wanted)]
+
+def parse_date(s: pd.Series) -> pd.Series:
+    """日付文字列（2024-05-01 / 2024/5/1 等の混在）を datetime64 に。解釈できない値は NaT。"""
+    return pd.to_datetime(s.astype(str).str.strip(), errors="coerce", format="mixed")
+
+def in_stock_mask(df: pd.DataFrame) -> pd.Series:
+    return df["売上フラグ"].fillna("").astype(str).str.strip() == ""
+
+# ─────────────────────────────────────────────
+#  店舗
+# ─────────────────────────────────────────────
+def stores(df: pd.DataFrame, configured=None) -> list:
+    """
+    店舗一覧。configured（既定 STORES）の順に並べ、
+    データにだけある店舗は名前順で後ろに追加する。
+    """
+    configured = list(configured if configured is not None else STORES)
+    if "店舗" not in df.columns:
+        return configured
+    found = df["店舗"].dropna().astype(str).str.strip().unique()
+    extra = sorted(set(found) - set(configured) - {"", "nan", "None"})
+    return configured + extra
+
+def store_index(df: pd.DataFrame) -> dict:
+    """
+    店舗名 → 行 index の対応表。
+    1回作っておけば店舗別の抽出は df.loc[index[店舗]] で、その店舗の行数分だけで済む。
+    """
+    if "店舗" not in df.columns:
+        return {}
+    keys = df["店舗"].astype(str).str.strip()
+    return {k: df.index[pos] for k, pos in keys.groupby(keys).indices.items()}
+
+def store_rows(df: pd.DataFrame, store: str, index: dict = None) -> pd.DataFrame:
+    """指定店舗の行（index があれば全件走査しない）"""
+    if index is not None:
+        return df.loc[index.get(store, df.index[:0])]
+    return df[df["店舗"].astype(str).str.strip() == store]
+
+# ─────────────────────────────────────────────
+#  検索
+# ─────────────────────────────────────────────
+def query(df: pd.DataFrame, *, show_all: bool = False, store: str = None,
+          brands=None, id_text: str = "", model: str = "", color: str = "",
+          index: dict = None) -> pd.DataFrame:
+    """
+    検索タブと同じ条件で絞り込む。
+    brands が空/None なら全ブランド、store が None なら全店舗。
+    index（store_index の結果）を渡すと店舗の絞り込みを最初に index で行う。
+    """
+    result = df
+    if store and "店舗" in result.columns:
+        result = store_rows(result, store, index)
+    if not show_all:
+        result = result[in_stock_mask(result)]
+    if brands and "ブランド" in result.columns:
+        result = result[result["ブランド"].astype(str).str.strip().isin(brands)]
+    if id_text.strip():
+        result = result[result["ID"].astype(str).str.contains(id_text.strip(), case=False, na=False)]
+    if model.strip():
+        result = result[result["モデル"].astype(str).str.contains(model.strip(), case=False, na=False)]
+    if color.strip():
+        result = result[result["カラー"].astype(str).str.contains(color.strip(), case=False, na=False)]
+    return result
+
+# ─────────────────────────────────────────────
+#  更新：フラグ
+# ─────────────────────────────────────────────
+def update_flag(df: pd.DataFrame, idx: int, flag: str,
+                year: int = None, month: int = None) -> pd.DataFrame:
+    df.at[idx, "売上フラグ"] = flag
+    if flag == "〇":
+        today = date.today()
+        df.at[idx, "売上年"]  = year  if year  else today.year
+        df.at[idx, "売上月"]  = month if month else today.month
+    else:
+        df.at[idx, "売上年"]  = ""
+        df.at[idx, "売上月"]  = ""
+    return df
+
+# ─────────────────────────────────────────────
+#  更新：店間移動
+# ─────────────────────────────────────────────
+def transfer_item(df: pd.DataFrame, idx: int,
+                  from_store: str, to_store: str) -> pd.DataFrame:
+    today_str = date.today().strftime("%Y-%m-%d")
+    df.at[idx, "店舗"]   = to_store
+    df.at[idx, "移動元"] = from_store
+    df.at[idx, "移動先"] = to_store
+    df.at[idx, "移動日"] = today_str
+    return df
+
+# ─────────────────────────────────────────────
+#  集計（ダッシュボード・夜間レポート共通）
+# ─────────────────────────────────────────────
+def flag_counts(df: pd.DataFrame) -> dict:
+    flags = df["売上フラグ"].fillna("")
+    return {
+        "総データ数": len(df),
+        "在庫あり":   int((flags == "").sum()),
+        "売上済み":   int((flags == "〇").sum()),
+        "スタッフ用": int((flags == "△").sum()),
+        "返品":       int((flags == "▲").sum()),
+    }
+
+def stock_by(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """key（店舗・ブランド等）別の在庫数（多い順）"""
+    return (df[in_stock_mask(df)].groupby(key).size()
+            .sort_values(ascending=False).reset_index(name="在庫数"))
+
+def sales_by_month(df: pd.DataFrame, year: int) -> pd.DataFrame:
+    """指定年の月別売上数"""
+    sold = df[(df["売上フラグ"] == "〇") &
+              (df["売上年"].astype(str).str.strip() == str(year))]
+    return sold.groupby("売上月").size().reset_index(name="売上数").sort_values("売上月")
+
+def sales_by(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """key（店舗・ブランド等）別の売上数"""
+    return df[df["売上フラグ"] == "〇"].groupby(key).size().reset_index(name="売上数")
+
+def transfer_history(df: pd.DataFrame, dates: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    移動日が入っている行（新しい順）。
+    dates（aging.parse_dates の結果）を渡すと移動日を解析し直さずにそれで並べる。
+    """
+    if "移動日" not in df.columns:
+        return df.iloc[0:0]
+    history = df[df["移動日"].notna() & (df["移動日"].astype(str).str.strip() != "")]
+    cols = [c for c in ["ID","ブランド","モデル","カラー","店舗","移動元","移動先","移動日"]
+            if c in history.columns]
+    # 文字列ではなく日付として新しい順に並べる（解釈できない値は末尾）
+    moved = dates.loc[history.index, "移動日"] if dates is not None else parse_date(history["移動日"])
+    order = moved.sort_values(ascending=False, na_position="last").index
+    return history.loc[order, cols].reset_index(drop=True)
@@ -6,16 +6,26 @@ dashboard.py
 import streamlit as st
 import pandas as pd
 from datetime import date
+from modules import core, data as D, downloads
+
+# ストリーミング読み込み時にこのタブが必要とする列
+COLUMNS = ["店舗", "ブランド", "売上フラグ", "売上年", "売上月"]
+
 
 
 def render(df: pd.DataFrame):
     st.subheader("📊 在庫・売上ダッシュボード")
 
-    total     = len(df)
-    in_stock  = len(df[df["売上フラグ"].fillna("") == ""])
-    sold      = len(df[df["売上フラグ"].fillna("") == "〇"])
-    staff     = len(df[df["売上フラグ"].fillna("") == "△"])
-    returned  = len(df[df["売上フラグ"].fillna("") == "▲"])
+    # 店舗を選ぶとその店舗の行だけで集計（店舗 index 経由なので全件走査しない）
+    target = st.selectbox("対象店舗", [core.ALL_STORES] + D.stores(), key="dash_store")
+    view   = df if target == core.ALL_STORES else D.store_rows(target)
+
+    counts    = core.flag_counts(view)
+    total     = counts["総データ数"]
+    in_stock  = counts["在庫あり"]
+    sold      = counts["売上済み"]
+    staff     = counts["スタッフ用"]
+    returned  = counts["返品"]
 
     m1, m2, m3, m4, m5 = st.columns(5)
     m1.metric("総データ数",      total)
@@ -30,15 +40,13 @@ def render(df: pd.DataFrame):
     with d1:
         st.markdown("#### 店舗別 在庫数")
         if "店舗" in df.columns:
-            s = df[df["売上フラグ"].fillna("") == ""].groupby("店舗").size().reset_index(name="在庫数")
+            s = core.stock_by(df, "店舗")
             st.bar_chart(s.set_index("店舗"))
 
     with d2:
         st.markdown("#### ブランド別 在庫数 TOP20")
         if "ブランド" in df.columns:
-            b = (df[df["売上フラグ"].fillna("") == ""]
-                 .groupby("ブランド").size().sort_values(ascending=False)
-                 .head(20).reset_index(name="在庫数"))
+            b = core.stock_by(view, "ブランド").head(20)
             st.bar_chart(b.set_index("ブランド"))
 
     st.divider()
@@ -47,11 +55,8 @@ def render(df: pd.DataFrame):
     with d3:
         st.markdown("#### 月別 売上数（今年）")
         if "売上年" in df.columns and "売上月" in df.columns:
-            cur_year = date.today().year
-            sold_df  = df[(df["売上フラグ"] == "〇") &
-                          (df["売上年"].astype(str).str.strip() == str(cur_year))]
-            if not sold_df.empty:
-                m = sold_df.groupby("売上月").size().reset_index(name="売上数").sort_values("売上月")
+            m = core.sales_by_month(view, date.today().year)
+            if not m.empty:
                 m["売上月"] = m["売上月"].astype(str) + "月"
                 st.bar_chart(m.set_index("売上月"))
             else:
@@ -60,9 +65,30 @@ def render(df: pd.DataFrame):
     with d4:
         st.markdown("#### 店舗別 売上数")
         if "店舗" in df.columns:
-            ss = df[df["売上フラグ"] == "〇"].groupby("店舗").size().reset_index(name="売上数")
+            ss = core.sales_by(df, "店舗")
             st.bar_chart(ss.set_index("店舗"))
 
     st.divider()
+    with st.expander("📥 集計をダウンロード"):
+        reports = D.derived(f"dashboard_reports_{target}", lambda _: _reports(view))
+        name = st.selectbox("集計", list(reports), key="dash_report",
+                            label_visibility="collapsed")
+        downloads.render(reports[name], key="dashboard", stem=f"{name}_{target}",
+                         extra=(name, target))
+
     with st.expander("📄 全データを表示（デバッグ用）"):
         st.dataframe(df, use_container_width=True)
+
+
+def _reports(df: pd.DataFrame) -> dict:
+    """ダウンロード用の集計表（列が無いものは除く）"""
+    reports = {"フラグ別件数": pd.DataFrame(list(core.flag_counts(df).items()),
+                                           columns=["区分", "件数"])}
+    if "店舗" in df.columns:
+        reports["店舗別在庫数"] = core.stock_by(df, "店舗")
+        reports["店舗別売上数"] = core.sales_by(df, "店舗")
+    if "ブランド" in df.columns:
+        reports["ブランド別在庫数"] = core.stock_by(df, "ブランド")
+    if "売上年" in df.columns and "売上月" in df.columns:
+        reports["月別売上数（今年）"] = core.sales_by_month(df, date.today().year)
+    return reports
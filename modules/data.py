@@ -1,6 +1,9 @@
 """
 data.py  v2
-GSheets 接続・読み書き・キャッシュ管理
+GSheets 接続・読み書き・キャッシュ管理（Streamlit 層）
+
+在庫モデル・更新ロジックは modules.core（Streamlit 非依存）にあり、
+ここから再公開している（D.update_flag / D.transfer_item / D.FLAG_LABELS 等）。
 
 キャッシュ戦略:
   - df本体は st.session_state["_df_cache"] に保持
@@ -8,27 +11,41 @@ GSheets 接続・読み書き・キャッシュ管理
   - 保存時はAPIに書くが session_state も即更新（再取得しない）
   - TTLは600秒（10分）。手動更新ボタンで任意リフレッシュ可能
   - アプリ起動時の初回のみAPIを叩く
+  - df を差し替えるたびに version() が増える（派生データのメモ化キー）
+  - 日付の parse や分析結果は derived() でバージョンごとに1回だけ計算
+
+ストリーミング読み込み（load(columns=..., stream=True)）:
+  - gspread で A1 範囲を直接読む（GSheetsConnection.read は毎回シート全体を落とすため使わない）
+  - 各タブが宣言した COLUMNS の列だけを _CHUNK_ROWS 行ずつ取得
+  - index はシート上の行位置のまま（空行は除くが番号は詰めない）。完了判定はシートの行数で行う
+  - 1チャンク目（_CHUNK_ROWS 行）で即描画し、残りは load_remaining() が
+    _BATCH_ROWS 行ずつまとめて取得して最後に1回だけ差し替える
+    （チャンクごとに再描画・version() 更新をしないので、読み込みの手間は行数に比例）
+  - 有効にするには secrets の [app] に stream_load = true（app_config() で読む）
+  - 移動元/移動先/入荷年月日などは ensure_columns() / fetch_row() で必要時に取得
+  - save() は未取得の行・列をシート全体と突き合わせて補完し、列順をシートに揃えて書き込む
 """
 
+import os
+
 import streamlit as st
 import pandas as pd
 from streamlit_gsheets import GSheetsConnection
-from datetime import date
+from modules import aging, core, storage
+from modules.core import FLAG_LABELS, STORES, NUM_COLS, normalize, update_flag, transfer_item  # noqa: F401
 
 # ─────────────────────────────────────────────
 #  定数
 # ─────────────────────────────────────────────
-FLAG_LABELS = {
-    "〇": "売上済み",
-    "△": "スタッフ用",
-    "▲": "返品",
-    "×": "除外",
-    "":  "在庫あり",
-}
-STORES = ["ニコメ", "マトイ"]
 
 _CACHE_KEY    = "_df_cache"       # session_state キー
+_STREAM_KEY   = "_df_stream"      # ストリーミング読み込みの進捗
+_VERSION_KEY  = "_df_version"     # df が差し替わるたびに増えるバージョン
+_DERIVED_KEY  = "_df_derived"     # バージョンごとの派生データ {name: (version, value)}
 _TTL_SECONDS  = 600               # 自動リフレッシュ間隔（秒）
+_NUM_COLS     = NUM_COLS          # シートから読む列数（先頭から）
+_CHUNK_ROWS   = 500               # ストリーミング時に最初に描画する行数
+_BATCH_ROWS   = 5000              # 残りの行を取得するときの1回の取得行数
 
 # ─────────────────────────────────────────────
 #  接続（アプリ全体で1インスタンス）
@@ -37,6 +54,11 @@ _TTL_SECONDS  = 600               # 自動リフレッシュ間隔（秒）
 def get_conn():
     return st.connection("gsheets", type=GSheetsConnection)
 
+@st.cache_resource
+def get_worksheet():
+    """ストリーミング読み込み用：範囲指定で読むための gspread Worksheet"""
+    return storage.open_worksheet(dict(st.secrets["connections"]["gsheets"]))
+
 # ─────────────────────────────────────────────
 #  APIからの生読み込み（内部用・直接呼ばない）
 # ─────────────────────────────────────────────
@@ -44,25 +66,211 @@ def get_conn():
 def _fetch_from_api() -> pd.DataFrame:
     """TTLキャッシュ付きAPI取得。TTL内は何度呼ばれてもAPIを叩かない。"""
     conn = get_conn()
-    df = conn.read(usecols=list(range(15)), ttl=_TTL_SECONDS)
-    df.columns = df.columns.str.strip()
-    if "売上フラグ" in df.columns:
-        df["売上フラグ"] = df["売上フラグ"].fillna("").astype(str).str.strip()
-    return df
+    df = conn.read(usecols=list(range(_NUM_COLS)), ttl=_TTL_SECONDS)
+    return normalize(df)
+
+@st.cache_data(ttl=_TTL_SECONDS, show_spinner=False)
+def _fetch_header() -> list:
+    """列名だけを取得（ストリーミング時の列位置解決用）"""
+    return storage.read_header(get_worksheet())
+
+@st.cache_data(ttl=_TTL_SECONDS, show_spinner=False)
+def _fetch_row_count() -> int:
+    """シートのデータ行数（ID 列の最終行まで。途中の空行も含む）"""
+    header = _fetch_header()
+    col = header.index("ID") + 1 if "ID" in header else 1
+    return storage.count_rows(get_worksheet(), col)
+
+@st.cache_data(ttl=_TTL_SECONDS, show_spinner=False)
+def _fetch_chunk(start: int, nrows: int, usecols: tuple, drop_empty: bool = True) -> pd.DataFrame:
+    """
+    データ行 [start, start+nrows) × 指定列位置 だけを取得（1回の API 呼び出し）。
+    index はシート上のデータ行番号（0始まり）。空行を除いても番号は詰めない。
+    """
+    return storage.read_rows(get_worksheet(), _fetch_header(), start, nrows, usecols,
+                             drop_empty=drop_empty)
+
+def _in_sheet_order(df: pd.DataFrame) -> pd.DataFrame:
+    """列をシートの列順に並べ替える（シートに無い列は末尾）"""
+    header = _fetch_header()
+    cols = [c for c in header if c in df.columns] + [c for c in df.columns if c not in header]
+    return df[cols]
+
+# ─────────────────────────────────────────────
+#  session_state の df 差し替え（バージョンを更新）
+# ─────────────────────────────────────────────
+def _set_df(df: pd.DataFrame):
+    st.session_state[_CACHE_KEY]   = df
+    st.session_state[_VERSION_KEY] = st.session_state.get(_VERSION_KEY, 0) + 1
+
+def version() -> int:
+    """
+    データのバージョン（読み込み・チャンク追加・保存のたびに増える）。
+    派生データ（検索結果・集計・エクスポート等）のメモ化キーに使う。
+    """
+    return st.session_state.get(_VERSION_KEY, 0)
+
+def derived(name: str, fn):
+    """
+    fn(df) の結果をデータバージョンごとに1回だけ計算して返す。
+    name はパラメータを含めて一意にすること（例: "aging_店舗_180"）。
+    """
+    store = st.session_state.setdefault(_DERIVED_KEY, {})
+    hit   = store.get(name)
+    if hit is not None and hit[0] == version():
+        return hit[1]
+    value = fn(st.session_state[_CACHE_KEY])
+    store[name] = (version(), value)
+    return value
+
+def app_config(key: str, default=None):
+    """secrets の [app] セクションの設定値（無ければ default）"""
+    try:
+        return st.secrets.get("app", {}).get(key, default)
+    except FileNotFoundError:
+        # secrets.toml が無い環境（テスト等）だけ default にする。
+        # StreamlitSecretNotFoundError も FileNotFoundError の派生だが、
+        # 書式の壊れた secrets.toml でも送出されるので、ファイルがあれば握りつぶさない。
+        if any(os.path.exists(p) for p in st.get_option("secrets.files")):
+            raise
+        return default
+
+def stores() -> list:
+    """
+    店舗一覧（secrets の [app] stores で順序を指定可能。データにだけある店舗は後ろに追加）
+    """
+    configured = app_config("stores", STORES)
+    return derived("stores", lambda d: core.stores(d, configured))
+
+def store_index() -> dict:
+    """店舗名 → 行 index（データバージョンごとに1回だけ作る）"""
+    return derived("store_index", core.store_index)
+
+def store_rows(store: str) -> pd.DataFrame:
+    """指定店舗の行だけを返す（その店舗の行数分のコスト）"""
+    return core.store_rows(st.session_state[_CACHE_KEY], store, store_index())
+
+def dates() -> pd.DataFrame:
+    """入荷日・売上日・移動日を datetime 化したフレーム（df と同じ index）"""
+    return derived("dates", aging.parse_dates)
 
 # ─────────────────────────────────────────────
 #  公開：データ読み込み
 # ─────────────────────────────────────────────
-def load() -> pd.DataFrame:
+def load(columns: list = None, stream: bool = False) -> pd.DataFrame:
     """
     session_stateにキャッシュがあればそちらを返す。
     なければAPIから取得してsession_stateに保存。
     → 検索・表示操作では一切APIを叩かない。
+
+    columns / stream を指定するとストリーミング読み込み：
+    指定列だけを1チャンク分取得して返し、残りは load_remaining() で追加する。
     """
     if _CACHE_KEY not in st.session_state:
-        st.session_state[_CACHE_KEY] = _fetch_from_api().copy()
+        if columns is None and not stream:
+            _set_df(_fetch_from_api().copy())
+        else:
+            _start_stream(columns, _CHUNK_ROWS if stream else None)
     return st.session_state[_CACHE_KEY]
 
+def required_columns(*tabs) -> list:
+    """各タブモジュールの COLUMNS を重複なく結合（宣言順を維持）"""
+    cols = []
+    for tab in tabs:
+        for c in getattr(tab, "COLUMNS", ()):
+            if c not in cols:
+                cols.append(c)
+    return cols
+
+# ─────────────────────────────────────────────
+#  公開：ストリーミング読み込み
+# ─────────────────────────────────────────────
+def _start_stream(columns: list, chunk_rows: int):
+    header  = _fetch_header()
+    total   = _fetch_row_count()
+    wanted  = header if columns is None else [c for c in header if c in columns]
+    usecols = tuple(header.index(c) for c in wanted)
+    nrows   = total if chunk_rows is None else min(chunk_rows, total)
+    first   = _fetch_chunk(0, nrows, usecols)
+    st.session_state[_STREAM_KEY] = {
+        "usecols": usecols,
+        "next":    nrows,
+        "total":   total,
+        "done":    nrows >= total,
+    }
+    _set_df(first.copy())
+
+def is_complete() -> bool:
+    """全行・全列が読み込み済みか"""
+    state = st.session_state.get(_STREAM_KEY)
+    return state is None or (state["done"] and len(state["usecols"]) == len(_fetch_header()))
+
+def is_streaming() -> bool:
+    """まだ取得していない行があるか"""
+    state = st.session_state.get(_STREAM_KEY)
+    return state is not None and not state["done"]
+
+def load_remaining(progress=None) -> pd.DataFrame:
+    """
+    残りの行を _BATCH_ROWS 行ずつ取得し、最後に1回だけ session_state の df を差し替える。
+    version() も1回しか増えないので、派生データの作り直しも1回で済む。
+    progress(読み込み済み行数, 全行数) を渡すと取得のたびに呼ぶ。
+    """
+    state = st.session_state.get(_STREAM_KEY)
+    df    = st.session_state[_CACHE_KEY]
+    if state is None or state["done"]:
+        return df
+    # 完了判定は返ってきた行数ではなくシートの行数で行う
+    parts, start = [df], state["next"]
+    while start < state["total"]:
+        nrows = min(_BATCH_ROWS, state["total"] - start)
+        parts.append(_fetch_chunk(start, nrows, state["usecols"])[df.columns])
+        start += nrows
+        if progress is not None:
+            progress(start, state["total"])
+    df = pd.concat(parts)
+    state["next"], state["done"] = start, True
+    _set_df(df)
+    return df
+
+def ensure_columns(columns: list) -> pd.DataFrame:
+    """
+    未取得の列を読み込み済みの行範囲分だけ取得して追加する。
+    以降のチャンクにもその列が含まれる。
+    """
+    state = st.session_state.get(_STREAM_KEY)
+    df    = st.session_state[_CACHE_KEY]
+    if state is None:
+        return df
+    header  = _fetch_header()
+    missing = [c for c in columns if c in header and c not in df.columns]
+    if not missing:
+        return df
+    usecols = tuple(header.index(c) for c in missing)
+    extra   = _fetch_chunk(0, state["next"], usecols)
+    df = _in_sheet_order(df.join(extra[missing], how="left"))
+    state["usecols"] = tuple(sorted(set(state["usecols"]) | set(usecols)))
+    _set_df(df)
+    return df
+
+def fetch_row(idx: int) -> pd.Series:
+    """
+    1行分の全列を取得（詳細表示用）。
+    session_state 側の値（未保存の編集を含む）を優先する。
+    """
+    df  = st.session_state.get(_CACHE_KEY)
+    row = df.loc[idx] if df is not None and idx in df.index else pd.Series(dtype=object)
+    state = st.session_state.get(_STREAM_KEY)
+    if state is None or is_complete() or not 0 <= idx < state["total"]:
+        return row
+    full = _fetch_chunk(idx, 1, tuple(range(len(_fetch_header()))))
+    if full.empty:
+        return row
+    merged = full.iloc[0].copy()
+    merged.update(row)
+    merged.name = idx
+    return merged
+
 # ─────────────────────────────────────────────
 #  公開：強制リフレッシュ（手動更新ボタン用）
 # ─────────────────────────────────────────────
@@ -74,8 +282,14 @@ def force_reload() -> pd.DataFrame:
     st.cache_data.clear()
     if _CACHE_KEY in st.session_state:
         del st.session_state[_CACHE_KEY]
+    state = st.session_state.pop(_STREAM_KEY, None)
+    if state is not None:
+        # ストリーミング中なら同じ列構成で1チャンク目から読み直す
+        header = _fetch_header()
+        _start_stream([header[i] for i in state["usecols"]], _CHUNK_ROWS)
+        return st.session_state[_CACHE_KEY]
     df = _fetch_from_api().copy()
-    st.session_state[_CACHE_KEY] = df
+    _set_df(df)
     return df
 
 # ─────────────────────────────────────────────
@@ -87,33 +301,49 @@ def save(df: pd.DataFrame):
     TTLキャッシュは破棄しない → 次のload()はsession_stateから高速返却。
     """
     conn = get_conn()
-    conn.update(data=df)
+    if st.session_state.get(_STREAM_KEY) is not None:
+        # ストリーミング読み込み時は、シート全体（空行も含む）に編集内容を重ねてから書く。
+        # 未取得の行・列を落とさず、行位置と列順（ensure_columns で後から足した列も）をシートに揃える。
+        df = _in_sheet_order(_merge_onto_full(df))
+        st.session_state.pop(_STREAM_KEY, None)
+        conn.update(data=df)
+        _set_df(_without_blank_rows(df).copy())
+        return
+    # ストリーミング後の df は空行を除いてあるので、行位置に空行を戻して書く
+    conn.update(data=_with_blank_rows(df))
     # session_stateを新データで上書き（API再取得なし）
-    st.session_state[_CACHE_KEY] = df.copy()
+    _set_df(df.copy())
 
-# ─────────────────────────────────────────────
-#  ヘルパー：フラグ更新
-# ─────────────────────────────────────────────
-def update_flag(df: pd.DataFrame, idx: int, flag: str,
-                year: int = None, month: int = None) -> pd.DataFrame:
-    df.at[idx, "売上フラグ"] = flag
-    if flag == "〇":
-        today = date.today()
-        df.at[idx, "売上年"]  = year  if year  else today.year
-        df.at[idx, "売上月"]  = month if month else today.month
-    else:
-        df.at[idx, "売上年"]  = ""
-        df.at[idx, "売上月"]  = ""
-    return df
+def _without_blank_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """シート上の空行（売上フラグ以外すべて空）を表示用の df から除く。index は変えない。"""
+    rest = df.drop(columns=["売上フラグ"], errors="ignore")
+    keep = rest.notna().any(axis=1)
+    if "売上フラグ" in df.columns:
+        keep |= df["売上フラグ"] != ""
+    return df[keep]
 
-# ─────────────────────────────────────────────
-#  ヘルパー：店間移動
-# ─────────────────────────────────────────────
-def transfer_item(df: pd.DataFrame, idx: int,
-                  from_store: str, to_store: str) -> pd.DataFrame:
-    today_str = date.today().strftime("%Y-%m-%d")
-    df.at[idx, "店舗"]   = to_store
-    df.at[idx, "移動元"] = from_store
-    df.at[idx, "移動先"] = to_store
-    df.at[idx, "移動日"] = today_str
-    return df
+def _with_blank_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """_without_blank_rows で除いた空行を元の行位置に戻す（index が連番なら何もしない）"""
+    if df.empty or not pd.api.types.is_integer_dtype(df.index):
+        return df
+    rows = pd.RangeIndex(df.index.max() + 1)
+    return df if len(rows) == len(df) else df.reindex(rows)
+
+def _merge_onto_full(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    部分的な df をシート全体（行位置を保った範囲読み込み）に重ねる。
+    読み込み済みの列は df の値をそのまま採用し、
+    未読み込みの列は df 側で値が入った箇所（例: transfer_item の書き込み）だけ採用する。
+    """
+    state  = st.session_state[_STREAM_KEY]
+    header = _fetch_header()
+    loaded = {header[i] for i in state["usecols"]}
+    full   = _fetch_chunk(0, state["total"], tuple(range(len(header))), drop_empty=False).copy()
+    for c in df.columns:
+        if c not in full.columns:
+            full[c] = ""
+        if c in loaded:
+            full.loc[df.index, c] = df[c]
+        else:
+            full.loc[df.index, c] = df[c].where(df[c].notna(), full.loc[df.index, c])
+    return full
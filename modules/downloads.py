@@ -0,0 +1,54 @@
+"""
+downloads.py
+表示中のデータをファイルでダウンロードする共通 UI
+
+使い方:
+  downloads.render(result, key="search", stem="在庫検索結果")
+
+  - 形式（CSV / Excel / Parquet）を選んで「ファイルを作成」を押すと生成
+  - 生成結果は key ごとに1つだけ BytesIO のまま session_state に保持し、
+    データが変わらない限り再実行時も作り直さない
+  - データバージョン・形式・条件が変わったら古いファイルはすぐ捨てる
+"""
+
+from datetime import date
+
+import streamlit as st
+import pandas as pd
+from modules import data as D, export
+
+_CACHE_KEY = "_download_cache"   # {key: ((version, fmt, extra), BytesIO)}
+
+
+def render(df: pd.DataFrame, key: str, stem: str, extra=None):
+    """
+    df をダウンロードするボタン群を描画。
+    extra には df の中身を決める条件（フィルタ値など）を渡す（変われば作り直す）。
+    """
+    cache = st.session_state.setdefault(_CACHE_KEY, {})
+
+    c1, c2, c3 = st.columns([1.2, 1, 1.2])
+    fmt = c1.selectbox(
+        "形式", list(export.FORMATS),
+        format_func=lambda f: export.FORMATS[f]["label"],
+        key=f"dl_fmt_{key}", label_visibility="collapsed",
+    )
+    token  = (D.version(), fmt, extra)
+    cached = cache.get(key)
+    if cached is not None and cached[0] != token:
+        # 中身が古くなったファイルは作り直しを待たずに手放す
+        del cache[key]
+        cached = None
+
+    if cached is None:
+        if c2.button("📥 ファイルを作成", key=f"dl_make_{key}", disabled=df.empty):
+            cached = cache[key] = (token, export.to_buffer(df, fmt))
+
+    if cached is not None:
+        c3.download_button(
+            f"⬇️ {export.FORMATS[fmt]['label']} をダウンロード（{len(df)} 行）",
+            data=cached[1],
+            file_name=export.file_name(f"{stem}_{date.today():%Y%m%d}", fmt),
+            mime=export.FORMATS[fmt]["mime"],
+            key=f"dl_btn_{key}",
+        )
@@ -0,0 +1,111 @@
+"""
+export.py
+DataFrame → CSV / Excel / Parquet の書き出し（Streamlit 非依存）
+
+CHUNK_ROWS 行ずつ書き出すので、全在庫の書き出しでも
+df 全体の文字列表現を一度に作らない（メモリが倍にならない）。
+  - CSV     : BOM 付き UTF-8（Excel でそのまま開ける）
+  - Excel   : openpyxl の write_only モードで1行ずつ追記
+  - Parquet : pyarrow の ParquetWriter でチャンクごとに row group を追加
+"""
+
+import io
+
+import pandas as pd
+
+CHUNK_ROWS = 5000
+
+FORMATS = {
+    "csv":     {"label": "CSV",     "ext": ".csv",     "mime": "text/csv"},
+    "xlsx":    {"label": "Excel",   "ext": ".xlsx",
+                "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "parquet": {"label": "Parquet", "ext": ".parquet", "mime": "application/octet-stream"},
+}
+
+
+def format_from_path(path: str) -> str:
+    """拡張子から形式名を返す（不明なら csv）"""
+    lower = str(path).lower()
+    for fmt, spec in FORMATS.items():
+        if lower.endswith(spec["ext"]):
+            return fmt
+    return "xlsx" if lower.endswith(".xls") else "csv"
+
+
+def _chunks(df: pd.DataFrame, chunk_rows: int):
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+# ─────────────────────────────────────────────
+#  形式別の書き出し
+# ─────────────────────────────────────────────
+def _write_csv(df, f, chunk_rows):
+    f.write("\ufeff".encode("utf-8"))
+    for i, chunk in enumerate(_chunks(df, chunk_rows)):
+        f.write(chunk.to_csv(index=False, header=(i == 0)).encode("utf-8"))
+
+def _write_xlsx(df, f, chunk_rows):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("data")
+    ws.append([str(c) for c in df.columns])
+    for chunk in _chunks(df, chunk_rows):
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            ws.append(list(row))
+    wb.save(f)
+
+def _write_parquet(df, f, chunk_rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    # スキーマは df 全体から1回だけ作り、全チャンクで使い回す（数値・日付の列は型のまま）。
+    # 型が混在する object 列（数値と "" 等）と空の object 列だけ文字列にする。
+    mixed = {str(c): "string" for c in df.columns
+             if df[c].dtype == object
+             and pd.api.types.infer_dtype(df[c], skipna=True) not in _ARROW_TYPES}
+
+    def prepare(frame):
+        frame = frame.rename(columns=str)
+        return frame.astype(mixed) if mixed else frame
+
+    schema = pa.Schema.from_pandas(prepare(df), preserve_index=False)
+    with pq.ParquetWriter(f, schema) as writer:
+        for chunk in _chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(prepare(chunk), schema=schema,
+                                                    preserve_index=False))
+
+# object 列でも値の型が揃っていればそのまま pyarrow の型にできるもの（infer_dtype の結果）
+_ARROW_TYPES = {"string", "bytes", "integer", "floating", "mixed-integer-float", "decimal",
+                "boolean", "datetime64", "datetime", "date", "time"}
+
+_WRITERS = {"csv": _write_csv, "xlsx": _write_xlsx, "parquet": _write_parquet}
+
+# ─────────────────────────────────────────────
+#  公開
+# ─────────────────────────────────────────────
+def write(df: pd.DataFrame, target, fmt: str = None, chunk_rows: int = CHUNK_ROWS):
+    """
+    target（パス or バイナリファイルオブジェクト）に書き出す。
+    fmt 省略時はパスの拡張子から判定。
+    """
+    fmt = fmt or format_from_path(target)
+    if fmt not in _WRITERS:
+        raise ValueError(f"未対応の形式です: {fmt}（{', '.join(FORMATS)}）")
+    if isinstance(target, (str, bytes)) or hasattr(target, "__fspath__"):
+        with open(target, "wb") as f:
+            _WRITERS[fmt](df, f, chunk_rows)
+    else:
+        _WRITERS[fmt](df, target, chunk_rows)
+
+def to_buffer(df: pd.DataFrame, fmt: str, chunk_rows: int = CHUNK_ROWS) -> io.BytesIO:
+    """
+    ダウンロードボタン用に先頭へ戻した BytesIO で返す。
+    getvalue() で bytes を複製せず、バッファをそのまま渡す。
+    """
+    buf = io.BytesIO()
+    write(df, buf, fmt, chunk_rows)
+    buf.seek(0)
+    return buf
+
+def file_name(stem: str, fmt: str) -> str:
+    return f"{stem}{FORMATS[fmt]['ext']}"
@@ -0,0 +1,91 @@
+"""
+prefs.py
+ユーザー（端末）ごとの設定をローカルに永続化する小さなストア
+
+保存先:
+  <PREFS_DIR>/<user_key>.json  （1ユーザー = 1ファイル）
+  PREFS_DIR は環境変数 STORE_STOCKS_PREFS_DIR で変更可能（既定: ./.user_prefs）
+
+方針:
+  - 起動時は自分のファイルを1回読むだけ（在庫シートには一切触れない）
+  - 変更時は変わったキーだけを差し替えて自分のファイルのみ書き直す
+  - 書き込みは一時ファイル → os.replace で原子的に行う
+"""
+
+import json
+import os
+import re
+import tempfile
+import uuid
+
+PREFS_DIR = os.environ.get(
+    "STORE_STOCKS_PREFS_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".user_prefs"),
+)
+
+_KEY_PATTERN = re.compile(r"[^0-9A-Za-z_\-]")
+
+
+# ─────────────────────────────────────────────
+#  ユーザーキー
+# ─────────────────────────────────────────────
+def new_user_key() -> str:
+    """端末用の新しいユーザーキーを発行する"""
+    return uuid.uuid4().hex[:12]
+
+
+def normalize_key(user_key: str) -> str:
+    """ファイル名に使えない文字を除去したキーを返す（空なら "default"）"""
+    key = _KEY_PATTERN.sub("", str(user_key or ""))[:64]
+    return key or "default"
+
+
+def _path(user_key: str) -> str:
+    return os.path.join(PREFS_DIR, f"{normalize_key(user_key)}.json")
+
+
+# ─────────────────────────────────────────────
+#  読み込み・書き込み
+# ─────────────────────────────────────────────
+def load(user_key: str) -> dict:
+    """ユーザーの設定を返す。ファイルが無い・壊れている場合は空 dict。"""
+    try:
+        with open(_path(user_key), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save(user_key: str, prefs: dict):
+    """ユーザーの設定ファイルを原子的に書き直す"""
+    os.makedirs(PREFS_DIR, exist_ok=True)
+    path = _path(user_key)
+    # 同じユーザーの別タブ（同一プロセス）と一時ファイルがぶつからないよう毎回一意に作る
+    fd, tmp = tempfile.mkstemp(dir=PREFS_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(prefs, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def update(user_key: str, **changes) -> dict:
+    """
+    指定キーだけを差し替えて保存する（差分がなければ書き込まない）。
+    set は JSON 用にソート済みリストへ変換する。
+    """
+    prefs   = load(user_key)
+    changed = False
+    for k, v in changes.items():
+        if isinstance(v, (set, frozenset)):
+            v = sorted(v)
+        if prefs.get(k) != v:
+            prefs[k] = v
+            changed  = True
+    if changed:
+        save(user_key, prefs)
+    return prefs
@@ -9,12 +9,16 @@ search.py  v5
 import streamlit as st
 import pandas as pd
 from datetime import date
-from modules import data as D
+from modules import aging, core, data as D, downloads
 from modules.settings import get_allowed_brands, get_fav_brands
 
 # ─────────────────────────────────────────────
 #  定数
 # ─────────────────────────────────────────────
+# ストリーミング読み込み時にこのタブが必要とする列（詳細モーダル用の列は fetch_row で取得）
+COLUMNS = ["ID", "ブランド", "モデル", "カラー", "店舗", "下代", "上代（税込）",
+           "売上フラグ", "売上年", "売上月", "備考"]
+
 FLAG_OPTIONS = ["", "〇", "△", "▲", "×"]
 FLAG_LABELS_DISPLAY = {
     "":  "在庫有",
@@ -64,6 +68,7 @@ div[data-testid="stHorizontalBlock"] input {
 # ─────────────────────────────────────────────
 @st.dialog("📋 商品詳細", width="large")
 def _show_detail(row: pd.Series):
+    row   = D.fetch_row(row.name)
     flag  = str(row.get("売上フラグ", "")).strip()
     brand = str(row.get("ブランド", ""))
     model = str(row.get("モデル", ""))
@@ -124,6 +129,9 @@ def _show_detail(row: pd.Series):
     s3.metric("売上年",    clean(row.get("売上年","")))
     s4.metric("売上月",    clean(row.get("売上月","")))
     s5.metric("入荷年月日", clean(row.get("入荷年月日","")))
+    days = aging.days_in_stock(row.to_frame().T, aging.parse_dates(row.to_frame().T)).iloc[0]
+    if pd.notna(days):
+        st.caption(f"在庫日数: {int(days)} 日" if flag == "" else f"入荷から売上まで: {int(days)} 日")
 
     # 移動情報
     st.markdown("#### 移動情報")
@@ -181,46 +189,33 @@ def render(df: pd.DataFrame):
                                      label_visibility="collapsed", key="s_color")
     with fd:
         st.markdown('<p class="col-label">🏪 店舗</p>', unsafe_allow_html=True)
-        store_filter = st.radio(
-            "店舗", ["マトイ", "ニコメ", "両方"],
-            index=2, label_visibility="collapsed", key="s_store",
+        store_options = D.stores() + [core.ALL_STORES]
+        store_widget  = st.radio if len(store_options) <= 3 else st.selectbox
+        store_filter  = store_widget(
+            "店舗", store_options,
+            index=len(store_options) - 1, label_visibility="collapsed", key="s_store",
         )
     with fe:
         st.markdown('<p class="col-label">　</p>', unsafe_allow_html=True)
         show_all = st.toggle("売済も表示", value=False, key="s_showall")
 
-    # ── フィルタリング ──────────────────────
-    result = df.copy()
-
-    if not show_all:
-        result = result[result["売上フラグ"].fillna("").astype(str).str.strip() == ""]
-    if store_filter != "両方" and "店舗" in result.columns:
-        result = result[result["店舗"].astype(str).str.strip() == store_filter]
-
-    allowed_brands = get_allowed_brands()
-    if allowed_brands and "ブランド" in result.columns:
-        result = result[result["ブランド"].astype(str).str.strip().isin(allowed_brands)]
-
-    if search_id.strip():
-        result = result[result["ID"].astype(str).str.contains(search_id.strip(), case=False, na=False)]
-    if search_model.strip():
-        result = result[result["モデル"].astype(str).str.contains(search_model.strip(), case=False, na=False)]
-    if search_color.strip():
-        result = result[result["カラー"].astype(str).str.contains(search_color.strip(), case=False, na=False)]
-
+    # ── フィルタリング（条件・データが同じなら前回の結果を再利用） ──
     fav_brands = get_fav_brands()
-    if fav_brands and "ブランド" in result.columns:
-        result = result.copy()
-        result["_is_fav"] = result["ブランド"].astype(str).str.strip().isin(fav_brands)
-        result = result.sort_values("_is_fav", ascending=False).drop(columns=["_is_fav"])
+    filters = (
+        show_all, store_filter, search_id.strip(), search_model.strip(), search_color.strip(),
+        tuple(sorted(get_allowed_brands())), tuple(sorted(fav_brands)),
+    )
+    result, total_stock = _filtered(df, filters)
 
     # ── 件数 ────────────────────────────────
-    total_stock = len(df[df["売上フラグ"].fillna("").astype(str).str.strip() == ""])
     if show_all:
         st.caption(f"表示: {len(result)} 件（全体在庫: {total_stock} 件）")
     else:
         st.caption(f"在庫あり: {len(result)} 件 ／ 総データ: {len(df)} 件　※売済等は非表示")
 
+    with st.expander("📥 検索結果をダウンロード"):
+        downloads.render(result, key="search", stem="在庫検索結果", extra=filters)
+
     if len(result) > 200:
         st.warning("200件以上のため最初の200件を表示します。")
         result = result.head(200)
@@ -348,6 +343,43 @@ def render(df: pd.DataFrame):
         st.markdown("</div>", unsafe_allow_html=True)
 
 
+# ─────────────────────────────────────────────
+#  フィルタ結果のメモ化
+# ─────────────────────────────────────────────
+_RESULT_KEY = "_search_result"   # session_state キー: ((version, filters), result, total_stock)
+
+def _filtered(df: pd.DataFrame, filters: tuple):
+    """
+    検索条件 filters で絞り込んだ結果と全体在庫数を返す。
+    (データバージョン, 条件) が前回と同じなら再計算しない
+    （メモ入力や詳細表示による再実行、ダウンロードで使い回す）。
+    """
+    memo_key = (D.version(), filters)
+    cached   = st.session_state.get(_RESULT_KEY)
+    if cached is not None and cached[0] == memo_key:
+        return cached[1], cached[2]
+
+    show_all, store_filter, search_id, search_model, search_color, allowed, fav = filters
+    result = core.query(
+        df,
+        show_all=show_all,
+        store=None if store_filter == core.ALL_STORES else store_filter,
+        index=D.store_index(),
+        brands=set(allowed),
+        id_text=search_id,
+        model=search_model,
+        color=search_color,
+    )
+    if fav and "ブランド" in result.columns:
+        is_fav = result["ブランド"].astype(str).str.strip().isin(fav)
+        result = result.assign(_is_fav=is_fav).sort_values(
+            "_is_fav", ascending=False, kind="stable").drop(columns=["_is_fav"])
+
+    total_stock = int(core.in_stock_mask(df).sum())
+    st.session_state[_RESULT_KEY] = (memo_key, result, total_stock)
+    return result, total_stock
+
+
 # ─────────────────────────────────────────────
 #  フラグ適用（即時保存）
 # ─────────────────────────────────────────────
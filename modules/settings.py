@@ -7,23 +7,72 @@ settings.py
 session_state キー:
   "fav_brands"     : set  お気に入りブランド
   "allowed_brands" : set  表示許可ブランド（空 = 全表示）
+  "user_key"       : str  設定の保存キー（URL の ?user= と同期）
+
+永続化:
+  設定は modules.prefs でユーザーキーごとのローカルファイルに保存する。
+  ブランドフィルタは「非表示ブランド」として保存するので、
+  後からシートに追加された新ブランドは自動的に表示ONになる。
 """
 
 import streamlit as st
 import pandas as pd
+from modules import prefs
+
+# ストリーミング読み込み時にこのタブが必要とする列
+COLUMNS = ["ブランド"]
 
 SESSION_FAV     = "fav_brands"
 SESSION_ALLOWED = "allowed_brands"
+SESSION_USER    = "user_key"
+
+_SESSION_HIDDEN = "_hidden_brands"   # 保存済みの非表示ブランド
+_SESSION_KNOWN  = "_known_brands"    # init 済みのブランド
+
+_QUERY_USER = "user"
 
 # ─────────────────────────────────────────────
 #  セッション初期化（app.py 起動時に呼ぶ）
 # ─────────────────────────────────────────────
 def init(df: pd.DataFrame):
-    all_brands = _get_all_brands(df)
-    if SESSION_FAV not in st.session_state:
-        st.session_state[SESSION_FAV] = set()
-    if SESSION_ALLOWED not in st.session_state:
-        st.session_state[SESSION_ALLOWED] = set(all_brands)  # 初期は全表示
+    if SESSION_USER not in st.session_state:
+        st.session_state[SESSION_USER] = _resolve_user_key()
+    if SESSION_FAV not in st.session_state or SESSION_ALLOWED not in st.session_state:
+        # 設定ファイルを1回だけ読む（在庫シートは再取得しない）
+        saved = prefs.load(st.session_state[SESSION_USER])
+        st.session_state.setdefault(SESSION_FAV, set(saved.get("fav_brands", [])))
+        st.session_state.setdefault(SESSION_ALLOWED, set())
+        st.session_state[_SESSION_HIDDEN] = set(saved.get("hidden_brands", []))
+        st.session_state[_SESSION_KNOWN]  = set()
+
+    # 新しく現れたブランド（初回・ストリーミングで後から届いた分）は非表示設定以外ON
+    new_brands = set(_get_all_brands(df)) - st.session_state[_SESSION_KNOWN]
+    if new_brands:
+        st.session_state[SESSION_ALLOWED] |= new_brands - st.session_state[_SESSION_HIDDEN]
+        st.session_state[_SESSION_KNOWN]  |= new_brands
+
+def _resolve_user_key() -> str:
+    """URL の ?user= からキーを取得。無ければ発行して URL に書き戻す。"""
+    key = st.query_params.get(_QUERY_USER, "")
+    if not key:
+        key = prefs.new_user_key()
+        st.query_params[_QUERY_USER] = key
+    return prefs.normalize_key(key)
+
+# ─────────────────────────────────────────────
+#  更新（session_state とファイルを同時に更新）
+# ─────────────────────────────────────────────
+def set_fav_brands(brands: set):
+    st.session_state[SESSION_FAV] = set(brands)
+    prefs.update(st.session_state.get(SESSION_USER, ""), fav_brands=set(brands))
+
+def set_allowed_brands(brands: set, all_brands: list):
+    st.session_state[SESSION_ALLOWED] = set(brands)
+    # まだ読み込まれていない（ストリーミング中の）ブランドの非表示設定は残す
+    old_hidden = st.session_state.get(_SESSION_HIDDEN, set())
+    hidden = (old_hidden - set(all_brands)) | (set(all_brands) - set(brands))
+    st.session_state[_SESSION_HIDDEN] = hidden
+    prefs.update(st.session_state.get(SESSION_USER, ""), hidden_brands=hidden)
 
 # ─────────────────────────────────────────────
 #  外部参照用ゲッター
@@ -74,7 +123,7 @@ def render(df: pd.DataFrame):
         for i, brand in enumerate(fav_sorted):
             if rm_cols[i % 4].button(f"⭐ {brand}　✕", key=f"rm_fav_{brand}",
                                       help=f"{brand} をお気に入りから外す"):
-                st.session_state[SESSION_FAV].discard(brand)
+                set_fav_brands(set(fav) - {brand})
                 st.rerun()
     else:
         st.info("お気に入りはまだ登録されていません。下のリストから ⭐ を押して登録してください。")
@@ -90,10 +139,10 @@ def render(df: pd.DataFrame):
     # 一括操作
     qa, qb, _ = st.columns([1, 1, 4])
     if qa.button("✅ 全てON"):
-        st.session_state[SESSION_ALLOWED] = set(all_brands)
+        set_allowed_brands(set(all_brands), all_brands)
         st.rerun()
     if qb.button("⬜ 全てOFF"):
-        st.session_state[SESSION_ALLOWED] = set()
+        set_allowed_brands(set(), all_brands)
         st.rerun()
 
     st.divider()
@@ -119,7 +168,7 @@ def render(df: pd.DataFrame):
                 new_fav.discard(brand)
             else:
                 new_fav.add(brand)
-            st.session_state[SESSION_FAV] = new_fav
+            set_fav_brands(new_fav)
             st.rerun()
 
         # 表示ON/OFFチェックボックス
@@ -128,8 +177,11 @@ def render(df: pd.DataFrame):
 
     # チェックボックスの変更を反映
     if new_allowed != allowed:
-        st.session_state[SESSION_ALLOWED] = new_allowed
+        set_allowed_brands(new_allowed, all_brands)
         st.rerun()
 
     st.divider()
-    st.caption("※ 設定はページを閉じるとリセットされます。将来的にスプレッドシートへの保存機能を追加予定。")
+    st.caption(
+        f"※ 設定はユーザーキー `{st.session_state.get(SESSION_USER, '')}` で保存されています。"
+        "このページの URL（?user=...）をブックマークすると次回も同じ設定で開けます。"
+    )
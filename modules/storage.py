@@ -0,0 +1,158 @@
+"""
+storage.py
+Streamlit を使わない入出力（夜間バッチ・CLI 用）
+
+  - Google Sheets : .streamlit/secrets.toml の [connections.gsheets] を読み、gspread で直接読み書き
+  - ローカル      : CSV / Excel / Parquet のスナップショット（書き出しは modules.export）
+
+gspread・pyarrow・openpyxl は使う関数の中で import する（CLI 起動を軽くするため）。
+"""
+
+import os
+
+import pandas as pd
+
+from modules import core, export
+
+SECRETS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".streamlit", "secrets.toml"
+)
+
+# ─────────────────────────────────────────────
+#  Google Sheets
+# ─────────────────────────────────────────────
+def load_sheet_config(path: str = SECRETS_PATH) -> dict:
+    """secrets.toml の [connections.gsheets] を dict で返す"""
+    import tomllib
+    with open(path, "rb") as f:
+        secrets = tomllib.load(f)
+    try:
+        return dict(secrets["connections"]["gsheets"])
+    except KeyError:
+        raise KeyError(f"{path} に [connections.gsheets] がありません") from None
+
+def open_worksheet(config: dict):
+    """[connections.gsheets] の設定から gspread の Worksheet を開く"""
+    import gspread
+    creds = {k: v for k, v in config.items() if k not in ("spreadsheet", "worksheet")}
+    client = gspread.service_account_from_dict(creds)
+    spreadsheet = config["spreadsheet"]
+    if spreadsheet.startswith("http"):
+        book = client.open_by_url(spreadsheet)
+    else:
+        book = client.open_by_key(spreadsheet)
+    worksheet = config.get("worksheet")
+    return book.worksheet(worksheet) if worksheet else book.sheet1
+
+def read_sheet(config: dict) -> pd.DataFrame:
+    """シート全体を読み込む（先頭 NUM_COLS 列）"""
+    values = open_worksheet(config).get_all_values()
+    if not values:
+        return pd.DataFrame()
+    from pandas.io.parsers import TextParser
+    header = values[0][:core.NUM_COLS]
+    rows   = [r[:core.NUM_COLS] for r in values[1:]]
+    # 型推定は GSheetsConnection.read（TextParser）と揃える。
+    # 空行は除くが、index はシート上のデータ行番号のまま（write_sheet が空行を元の位置に戻す）
+    keep = [i for i, r in enumerate(rows) if any(str(v).strip() for v in r)]
+    df = TextParser([header] + [rows[i] for i in keep], header=0).read()
+    df.index = pd.Index(keep)
+    return core.normalize(df)
+
+def read_header(ws) -> list:
+    """1行目（列名）だけを取得（先頭 NUM_COLS 列）"""
+    return [str(c).strip() for c in ws.row_values(1)[:core.NUM_COLS]]
+
+def count_rows(ws, col: int = 1) -> int:
+    """
+    データ行数（ヘッダー除く）。col 列目に値がある最終行までを数える。
+    途中の空行も数に入る（シート上の行位置を保つため）。
+    """
+    return max(len(ws.col_values(col)) - 1, 0)
+
+def read_rows(ws, header: list, start: int, nrows: int, usecols,
+              drop_empty: bool = True) -> pd.DataFrame:
+    """
+    データ行 [start, start+nrows) × usecols（列位置）だけを A1 範囲で取得。
+    index は常にシート上のデータ行番号（0始まり）。
+    drop_empty=True なら選んだ列がすべて空の行を除く（残った行の index は変えない）。
+    連続した列はまとめて1範囲にし、1回の batch_get で取る。
+    """
+    from gspread.utils import rowcol_to_a1
+    from pandas.io.parsers import TextParser
+
+    cols  = sorted(usecols)
+    names = [header[c] for c in cols]
+    if nrows <= 0 or not cols:
+        return pd.DataFrame(columns=names, index=pd.RangeIndex(start, start))
+
+    r0, r1 = start + 2, start + nrows + 1      # シートの1行目はヘッダー
+    runs   = _contiguous(cols)
+    blocks = ws.batch_get([f"{rowcol_to_a1(r0, a + 1)}:{rowcol_to_a1(r1, b + 1)}"
+                           for a, b in runs])
+    rows = [[] for _ in range(nrows)]
+    for (a, b), block in zip(runs, blocks):
+        width = b - a + 1
+        for i in range(nrows):
+            # Sheets API は末尾の空セル・空行を返さないので幅・行数を補う
+            cells = list(block[i]) if i < len(block) else []
+            rows[i].extend((cells + [""] * width)[:width])
+
+    # 型推定は GSheetsConnection.read（TextParser）と揃える
+    df = TextParser([names] + rows, header=0).read()
+    df.index = pd.RangeIndex(start, start + nrows)
+    if drop_empty:
+        df = df.dropna(how="all")
+    return core.normalize(df)
+
+def _contiguous(cols: list) -> list:
+    """[0,1,2,5,6] → [(0,2), (5,6)]"""
+    runs = []
+    for c in cols:
+        if runs and c == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], c)
+        else:
+            runs.append((c, c))
+    return runs
+
+def write_sheet(config: dict, df: pd.DataFrame):
+    """
+    シートを df で書き直す。
+    先に A1 から上書きし、その後で新しいデータより下に残った行だけを消す。
+    消すのは read_sheet が読む先頭 NUM_COLS 列の範囲だけ（それより右の列には触れない）。
+    clear() を先にすると、書き込みが失敗したときにシートが空のまま残るため。
+    """
+    from gspread.utils import rowcol_to_a1
+    ws = open_worksheet(config)
+    if len(df) and pd.api.types.is_integer_dtype(df.index):
+        df = df.reindex(pd.RangeIndex(df.index.max() + 1))   # read_sheet で除いた空行を戻す
+    values = [df.columns.tolist()] + df.astype(object).where(df.notna(), "").values.tolist()
+    width  = max(len(df.columns), 1)
+    # 範囲がシートの大きさを超えると書けないので、足りない行・列だけ追加する（削らない）
+    if len(values) > ws.row_count:
+        ws.add_rows(len(values) - ws.row_count)
+    if width > ws.col_count:
+        ws.add_cols(width - ws.col_count)
+    ws.update(range_name="A1", values=values, value_input_option="USER_ENTERED")
+    if ws.row_count > len(values):
+        last_col = max(width, min(core.NUM_COLS, ws.col_count))
+        ws.batch_clear([f"{rowcol_to_a1(len(values) + 1, 1)}:"
+                        f"{rowcol_to_a1(ws.row_count, last_col)}"])
+
+# ─────────────────────────────────────────────
+#  ローカルファイル（拡張子で形式を判定）
+# ─────────────────────────────────────────────
+def read_file(path: str) -> pd.DataFrame:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        df = pd.read_parquet(path)
+    elif ext in (".xlsx", ".xls"):
+        df = pd.read_excel(path, dtype=object)
+    else:
+        df = pd.read_csv(path, dtype=object)
+    return core.normalize(df)
+
+def write_file(df: pd.DataFrame, path: str):
+    """拡張子で形式を判定してチャンク単位で書き出す（modules.export）"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    export.write(df, path)
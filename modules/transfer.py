@@ -1,16 +1,20 @@
 """
 transfer.py
-店間移動タブ（ニコメ ⇄ マトイ）
+店間移動タブ（任意の店舗 → 店舗）
 """
 
 import streamlit as st
 import pandas as pd
 from datetime import date
-from modules import data as D
+from modules import core, data as D, downloads
+
+# ストリーミング読み込み時にこのタブが必要とする列（履歴用の列は表示時に取得）
+COLUMNS = ["ID", "ブランド", "モデル", "カラー", "店舗"]
+HISTORY_COLUMNS = ["移動元", "移動先", "移動日"]
 
 
 def render(df: pd.DataFrame):
-    st.subheader("🔄 店間移動（ニコメ ⇄ マトイ）")
+    st.subheader("🔄 店間移動")
     st.markdown("移動したい商品の **ID** を入力し、確認後にボタンを押してください。")
 
     t_col1, _ = st.columns([1, 2])
@@ -24,8 +28,14 @@ def render(df: pd.DataFrame):
 
     if not target_rows.empty:
         for row_idx, row in target_rows.iterrows():
-            current_store = str(row.get("店舗", ""))
-            other_store   = "マトイ" if current_store == "ニコメ" else "ニコメ"
+            current_store = str(row.get("店舗", "")).strip()
+            destinations  = [s for s in D.stores() if s != current_store]
+            if not destinations:
+                st.warning(f"ID {row.get('ID','')}: 移動先にできる店舗がありません。")
+                continue
+            other_store = st.selectbox(
+                f"移動先（ID: {row.get('ID','')}）", destinations, key=f"dest_{row_idx}",
+            )
 
             st.info(
                 f"**ID {row.get('ID','')}** ｜ {row.get('ブランド','')} "
@@ -53,14 +63,17 @@ def render(df: pd.DataFrame):
     # 移動履歴
     st.divider()
     st.subheader("📋 移動履歴")
+    if not set(HISTORY_COLUMNS) <= set(df.columns):
+        # 未取得なら表示を求められた時だけ履歴列を読み込む
+        if not st.toggle("移動履歴を読み込んで表示", value=False, key="t_history"):
+            return
+        df = D.ensure_columns(HISTORY_COLUMNS)
     if "移動日" in df.columns:
-        history = df[df["移動日"].notna() & (df["移動日"].astype(str).str.strip() != "")].copy()
+        # 移動日は D.dates() の解析済みの値で並べ、結果もデータ版ごとに1回だけ作る
+        history = D.derived("transfer_history", lambda d: core.transfer_history(d, D.dates()))
         if not history.empty:
-            cols = [c for c in ["ID","ブランド","モデル","カラー","店舗","移動元","移動先","移動日"] if c in history.columns]
-            st.dataframe(
-                history[cols].sort_values("移動日", ascending=False).reset_index(drop=True),
-                use_container_width=True,
-            )
+            st.dataframe(history, use_container_width=True)
+            downloads.render(history, key="transfer_history", stem="移動履歴")
         else:
             st.info("移動履歴はまだありません。")
     else: